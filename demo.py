@@ -1,14 +1,204 @@
 #!/usr/bin/env python3
+import hashlib
+import importlib.util
 import os
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
-
+from email.utils import formatdate
+from itertools import islice
 from pathlib import Path
-from shutil import copytree, ignore_patterns, rmtree
-from subprocess import DEVNULL, check_call
-from sys import executable as python
-import tempfile
+from shutil import copy2, copyfileobj, copystat, copytree, ignore_patterns, rmtree
+from subprocess import check_call
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+ANNOTATIONS_URL = 'https://raw.githubusercontent.com/taniki/netrights-dashboard-mockup/master/_data/annotations.json'
+
+# tox dir might have broken symlinks while tests are running in parallel
+# the rest aren't needed for the demo, and keep changing (git commands, bytecode and tool caches, virtualenvs),
+# which would invalidate the cached copy of the repository on every run
+_ignore_repo = ignore_patterns(
+    '.tox*',
+    '.nox',
+    '.git',
+    '__pycache__',
+    '.mypy_cache',
+    '.ruff_cache',
+    '.pytest_cache',
+    '.venv',
+    'venv',
+    '*.egg-info',
+)
+
+
+def _repo_fingerprint(repo: Path) -> str:
+    """
+    Cheap fingerprint of the repository: paths, sizes and mtimes, without reading any contents.
+    """
+    h = hashlib.sha1()
+    for root, dirs, files in os.walk(repo):
+        ignored = _ignore_repo(root, dirs + files)
+        dirs[:] = sorted(d for d in dirs if d not in ignored)
+        for f in sorted(f for f in files if f not in ignored):
+            path = os.path.join(root, f)
+            st = os.lstat(path)
+            h.update(f'{os.path.relpath(path, repo)}:{st.st_size}:{st.st_mtime_ns}\n'.encode())
+    return h.hexdigest()
+
+
+def _copy_file(src: str, dst: str) -> str:
+    """
+    Like shutil.copy2, but avoids copying the bytes where possible.
+
+    The cached copy is never modified, so first try a hardlink (metadata only).
+    If that's impossible (e.g. the cache is on a different device), let the kernel copy the data
+    with copy_file_range, which is a cheap reflink on copy-on-write filesystems like btrfs/xfs.
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        pass
+    else:
+        return dst
+    if hasattr(os, 'copy_file_range'):
+        try:
+            with open(src, 'rb') as fi, open(dst, 'wb') as fo:
+                while os.copy_file_range(fi.fileno(), fo.fileno(), 1 << 30) > 0:
+                    pass
+        except OSError:
+            pass  # e.g. not supported by the kernel/filesystem, fall back onto regular copy
+        else:
+            copystat(src, dst)
+            return dst
+    return copy2(src, dst)
+
+
+def _link_or_copy(src: Path, dst: Path) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        # e.g. on a different device
+        copy2(src, dst)
+
+
+def _demo_cache() -> Path:
+    return Path('~/.cache/hpi_demo').expanduser()
+
+
+def _cached_repo_copy(repo: Path) -> Path:
+    """
+    Returns a pristine copy of the repository, only copying it again if the repository changed since the last run.
+    """
+    repo_cache = _demo_cache() / 'repo'
+    repo_cache.mkdir(parents=True, exist_ok=True)
+    cached = repo_cache / _repo_fingerprint(repo)
+    if not cached.exists():
+        # another demo might be running concurrently, so build in a unique temporary dir and move it in place
+        tmp = tempfile.mkdtemp(dir=repo_cache, prefix='tmp')
+        copytree(repo, tmp, symlinks=True, ignore=_ignore_repo, copy_function=_copy_file, dirs_exist_ok=True)
+        try:
+            os.replace(tmp, cached)
+        except OSError:
+            if not cached.exists():
+                raise
+            # another run got there first
+            rmtree(tmp, ignore_errors=True)
+    # mark as used, so it isn't considered stale below
+    os.utime(cached)
+
+    # copies of the repository at other states are of no use anymore
+    # (unless some other demo run is using them right now, so only remove the ones unused for a while)
+    for entry in os.scandir(repo_cache):
+        if entry.path != str(cached) and time.time() - entry.stat(follow_symlinks=False).st_mtime > 24 * 60 * 60:
+            rmtree(entry.path, ignore_errors=True)
+    return cached
+
+
+def _setup_repo(repo: Path, dest: Path) -> Path:
+    """
+    Sets up a copy of the repository at dest, returns the cached copy it points to.
+    """
+    # the copy is cached across runs, so here we only symlink into it
+    # my/config.py is rendered from the cached copy in run(), so the cache stays pristine
+    cached_repo = _cached_repo_copy(repo)
+    os.mkdir(dest)
+    for entry in os.scandir(cached_repo):
+        if entry.name != 'my':
+            os.symlink(entry.path, dest / entry.name)
+    os.mkdir(dest / 'my')
+    for entry in os.scandir(cached_repo / 'my'):
+        if entry.name != 'config.py':
+            os.symlink(entry.path, dest / 'my' / entry.name)
+    return cached_repo
+
+
+def _install_hypexport() -> bool:
+    """
+    Returns whether hypexport had to be installed.
+    """
+    # find_spec only locates the package, without executing it (and its imports)
+    if importlib.util.find_spec('hypexport') is not None:
+        return False
+    # only pay for the pip subprocess on the first (cold) run
+    # tox doesn't like --user flag
+    user_flag = [] if 'TOX' in os.environ else ['--user']
+    check_call([sys.executable, '-m', 'pip', 'install', *user_flag, 'git+https://github.com/karlicoss/hypexport.git'])
+    return True
+
+
+def _download_annotations(dest: Path) -> None:
+    """
+    Puts annotations.json into dest. The download is cached across runs and only refreshed once a day.
+    """
+    os.makedirs(dest, exist_ok=True)
+    cached = _demo_cache() / 'annotations.json'
+    headers = {}
+    if cached.exists():
+        mtime = cached.stat().st_mtime
+        if time.time() - mtime < 24 * 60 * 60:
+            _link_or_copy(cached, dest / 'annotations.json')
+            return
+        headers['If-Modified-Since'] = formatdate(mtime, usegmt=True)
+
+    os.makedirs(cached.parent, exist_ok=True)
+    # unique name, since another demo might be downloading at the same time
+    fd, tmp = tempfile.mkstemp(dir=cached.parent, suffix='.tmp')
+    # download in-process rather than spawning curl
+    try:
+        with (
+            open(fd, 'wb') as fo,  # first, so the descriptor is closed even if the request fails
+            urlopen(Request(ANNOTATIONS_URL, headers=headers), timeout=60) as r,
+        ):
+            copyfileobj(r, fo, length=256 * 1024)
+    except HTTPError as e:
+        os.remove(tmp)
+        if e.code != 304:
+            raise
+        os.utime(cached)  # not modified, so it's good for another day
+    except BaseException:
+        os.remove(tmp)
+        raise
+    else:
+        os.replace(tmp, cached)
+    _link_or_copy(cached, dest / 'annotations.json')
+
 
-my_repo = Path(__file__).absolute().parent
+def _print_pages() -> None:
+    import my.hypothesis  # pylint: disable=import-outside-toplevel
+
+    pages = my.hypothesis.pages()
+
+    for page in islice(pages, 0, 8):
+        if isinstance(page, Exception):
+            raise page
+        print('URL:   ' + page.url)
+        print('Title: ' + page.title)
+        print('{} annotations'.format(len(page.highlights)))
+        print()
 
 
 def run() -> None:
@@ -50,37 +240,30 @@ def run() -> None:
 
     # uses fixed paths; worth it for the sake of demonstration
     # assumes we're in /tmp/my_demo now
+    demo_dir = Path.cwd()  # absolute paths are needed later, since we chdir before using them
+    # computed here rather than at import time, since the fallback below imports this module again
+    my_repo = Path(__file__).resolve().parent
 
-    # 1. clone git@github.com:karlicoss/my.git
-    copytree(
-        my_repo,
-        'my_repo',
-        symlinks=True,
-        ignore=ignore_patterns('.tox*'),  # tox dir might have broken symlinks while tests are running in parallel
-    )
+    hypothesis_backups = demo_dir / 'backups/hypothesis'
 
-    # 2. prepare repositories you'd be using. For this demo we only set up Hypothesis
-    try:
-        import hypexport  # type: ignore  # pylint: disable=unused-import,import-outside-toplevel
-    except ModuleNotFoundError:
-        # tox doesn't like --user flag
-        check_call(f'{python} -m pip {"" if 'TOX' in os.environ else "--user"} git+https://github.com/karlicoss/hypexport.git'.split())
-
-    # 3. prepare some demo Hypothesis data
-    hypothesis_backups = Path('backups/hypothesis').resolve()
-    hypothesis_backups.mkdir(exist_ok=True, parents=True)
-    check_call([
-        'curl',
-        'https://raw.githubusercontent.com/taniki/netrights-dashboard-mockup/master/_data/annotations.json',
-        '-o', f'{hypothesis_backups}/annotations.json',
-    ], stderr=DEVNULL)
-    #
+    # steps 1-3 are independent (disk, pip and network bound), so run them concurrently
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        # 1. clone git@github.com:karlicoss/my.git
+        repo_future = pool.submit(_setup_repo, my_repo, demo_dir / 'my_repo')
+        # 2. prepare repositories you'd be using. For this demo we only set up Hypothesis
+        install_future = pool.submit(_install_hypexport)
+        # 3. prepare some demo Hypothesis data
+        download_future = pool.submit(_download_annotations, hypothesis_backups)
+
+        cached_repo = repo_future.result()
+        installed = install_future.result()
+        download_future.result()
 
     # 4. point my.config to the Hypothesis data
-    mycfg_root = Path('my_repo').resolve()
-    mycfg_root.mkdir(exist_ok=True, parents=True)
+    mycfg_root = demo_dir / 'my_repo'
     init_file: Path = mycfg_root / 'my/config.py'
-    init_file.write_text(init_file.read_text().replace(
+    # render straight from the pristine template: one read and one write, no intermediate copy
+    init_file.write_text((cached_repo / 'my/config.py').read_text().replace(
         '/path/to/hypothesis/data',
         str(hypothesis_backups),
     ))
@@ -89,42 +272,36 @@ def run() -> None:
     # 4. now we can use it!
     os.chdir(my_repo)
 
-    check_call([python, '-c', '''
-import my.hypothesis
-
-pages = my.hypothesis.pages()
-
-from itertools import islice
-for page in islice(pages, 0, 8):
-    print('URL:   ' + page.url)
-    print('Title: ' + page.title)
-    print('{} annotations'.format(len(page.highlights)))
-    print()
-'''], env={
     # this is just to prevent demo.py from using real data
     # normally, it will rely on having my.config in ~/.config/my
-    'MY_CONFIG': str(mycfg_root),
-    **os.environ,
-})
+    # if config is already loaded in this interpreter, MY_CONFIG wouldn't take effect -- need a fresh one
+    # same if hypexport was just installed: pip might have created the user site-packages dir,
+    # which is only added to sys.path if it existed when the interpreter started
+    if installed or 'my.config' in sys.modules:
+        # the code itself lives in this module, so the child gets it from the cached .pyc rather than compiling a script
+        # note: can't pass -S to skip site.py here, hypexport might be installed to user site-packages (see step 2)
+        check_call([sys.executable, '-c', 'import demo; demo._print_pages()'], env={**os.environ, 'MY_CONFIG': str(mycfg_root)})
+    else:
+        # otherwise no need to pay for starting another interpreter and importing everything again
+        os.environ['MY_CONFIG'] = str(mycfg_root)
+        _print_pages()
 
 
 @contextmanager
-def named_temp_dir(name: str):
+def named_temp_dir(name: str) -> Iterator[str]:
     """
     Create a unique temporary directory and return a path that includes the specified name.
     """
-    unique_temp_dir = Path(tempfile.mkdtemp())
-    td = unique_temp_dir / name
+    # plain strings are enough here, os.chdir etc. accept them
+    unique_temp_dir = tempfile.mkdtemp()
+    td = os.path.join(unique_temp_dir, name)
     try:
-        td.mkdir()
+        os.mkdir(td)
         yield td
     except OSError as e:
         print(f"Failed to create {unique_temp_dir}: {e}")
     finally:
-        try:
-            rmtree(str(unique_temp_dir), ignore_errors=True)
-        except OSError as e:
-            print(f"Failed to cleanup {unique_temp_dir}: {e}")
+        rmtree(unique_temp_dir, ignore_errors=True)
 
 
 def main():
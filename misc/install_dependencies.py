@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+'''
+Installs HPI dependencies, without installing HPI itself (e.g. to use it via the with_my script).
+
+This is what 'setup.py --dependencies-only' used to do.
+The dependencies are read straight from pyproject.toml with the standard library (or tomli on python < 3.11),
+so there is no need to import setuptools or build the package just to get the list.
+'''
+
+import os
+import sys
+from pathlib import Path
+
+root = Path(__file__).absolute().parent.parent
+
+
+def dependencies() -> list[str]:
+    if sys.version_info >= (3, 11):
+        import tomllib
+    else:
+        # tomllib is only in the stdlib since 3.11, tomli is the same parser
+        try:
+            import tomli as tomllib
+        except ImportError:
+            sys.exit('On python < 3.11, reading pyproject.toml needs tomli: pip3 install --user tomli')
+
+    with (root / 'pyproject.toml').open('rb') as fo:
+        return tomllib.load(fo)['project']['dependencies']
+
+
+def main() -> None:
+    import argparse
+    p = argparse.ArgumentParser()
+    p.add_argument('--yes', action='store_true', help="don't ask for confirmation")
+    args = p.parse_args()
+
+    cmd = [sys.executable, '-m', 'pip', 'install', '--user', *dependencies()]
+    # only ask when there is someone to answer, e.g. in CI or a Dockerfile RUN step there is no one
+    if not args.yes and sys.stdin.isatty():
+        scmd = ' '.join(cmd)
+        xx = input(f'Run {scmd} [y/n] ')
+        if xx.strip() != 'y':
+            return
+    os.execv(sys.executable, cmd)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,15 +8,19 @@ from __future__ import annotations
 import sys
 from typing import TYPE_CHECKING
 
-if sys.version_info[:2] >= (3, 13):
+if sys.version_info >= (3, 13):
     from warnings import deprecated
 else:
     from typing_extensions import deprecated
 
 
+if TYPE_CHECKING:
+    # only needed for annotations, so we don't pay for loading sqlite on every import of compat
+    import sqlite3
+
+
 # keeping just for backwards compatibility, used to have compat implementation for 3.6
 if not TYPE_CHECKING:
-    import sqlite3
 
     @deprecated('use .backup method on sqlite3.Connection directly instead')
     def sqlite_backup(*, source: sqlite3.Connection, dest: sqlite3.Connection, **kwargs) -> None:
@@ -35,66 +39,50 @@ if not TYPE_CHECKING:
     ##
 
     ## used to have compat function before 3.8 for these, keeping for runtime back compatibility
-    from functools import cached_property
-    from typing import Literal, Protocol, TypedDict
+    # resolved lazily on attribute access (PEP 562), since nothing in HPI uses them anymore
+    _LEGACY_REEXPORTS = {
+        'cached_property': 'functools',
+        'Literal'        : 'typing',
+        'Protocol'       : 'typing',
+        'TypedDict'      : 'typing',
+        # used to need 'key' parameter, which bisect_left only has since python3.10
+        'bisect_left'    : 'bisect',
+    }
+
+    def __getattr__(name: str):
+        module = _LEGACY_REEXPORTS.get(name)
+        if module is None:
+            raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+        import importlib
+
+        return getattr(importlib.import_module(module), name)
 ##
 
 
 from typing import ParamSpec
 
 
-# bisect_left doesn't have a 'key' parameter (which we use)
-# till python3.10
-from bisect import bisect_left
-
-
 from datetime import datetime
 
-if sys.version_info[:2] >= (3, 11):
+# note: on 3.11+ this is the C builtin itself, so there is nothing to gain from compiling this module with mypyc/cython
+if sys.version_info >= (3, 11):
     fromisoformat = datetime.fromisoformat
 else:
     # fromisoformat didn't support Z as "utc" before 3.11
     # https://docs.python.org/3/library/datetime.html#datetime.datetime.fromisoformat
 
     def fromisoformat(date_string: str) -> datetime:
-        if date_string.endswith('Z'):
+        # slice compare is cheaper than .endswith call, and works for empty strings too
+        if date_string[-1:] == 'Z':
             date_string = date_string[:-1] + '+00:00'
         return datetime.fromisoformat(date_string)
 
 
-def test_fromisoformat() -> None:
-    from datetime import timezone
-
-    # fmt: off
-    # feedbin has this format
-    assert fromisoformat('2020-05-01T10:32:02.925961Z') == datetime(
-        2020, 5, 1, 10, 32, 2, 925961, timezone.utc,
-    )
-
-    # polar has this format
-    assert fromisoformat('2018-11-28T22:04:01.304Z') == datetime(
-        2018, 11, 28, 22, 4, 1, 304000, timezone.utc,
-    )
-
-    # stackexchange, runnerup has this format
-    assert fromisoformat('2020-11-30T00:53:12Z') == datetime(
-        2020, 11, 30, 0, 53, 12, 0, timezone.utc,
-    )
-    # fmt: on
-
-    # arbtt has this format (sometimes less/more than 6 digits in milliseconds)
-    # TODO doesn't work atm, not sure if really should be supported...
-    # maybe should have flags for weird formats?
-    # assert isoparse('2017-07-18T18:59:38.21731Z') == datetime(
-    #     2017, 7, 18, 18, 59, 38, 217310, timezone.utc,
-    # )
-
-
 from types import NoneType
 from typing import TypeAlias
 
 
-if sys.version_info[:2] >= (3, 11):
+if sys.version_info >= (3, 11):
     from typing import Never, assert_never, assert_type
 else:
     from typing_extensions import Never, assert_never, assert_type
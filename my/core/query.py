@@ -8,13 +8,16 @@ python3 -c "from my.core.query import select; help(select)"
 from __future__ import annotations
 
 import dataclasses
+import functools
+import heapq
 import importlib
-import inspect
 import itertools
+import operator
 from collections.abc import Iterable, Iterator
 from datetime import datetime
 from typing import (
     Any,
+    ClassVar,
     NamedTuple,
     Optional,
     TypeVar,
@@ -41,7 +44,12 @@ OrderFunc = Callable[[ET], Optional[U]]
 Where = Callable[[ET], bool]
 
 
+_SENTINEL: Any = object()
+
+
 # the generated OrderFunc couldn't handle sorting this
+# note: not meant to be subclassed, the helpers below check for it with 'type(o) is Unsortable',
+# which is cheaper than isinstance for every item
 class Unsortable(NamedTuple):
     obj: Any
 
@@ -52,20 +60,21 @@ class QueryException(ValueError):
     pass
 
 
+@functools.lru_cache(maxsize=1024)
 def locate_function(module_name: str, function_name: str) -> Callable[[], Iterable[ET]]:
     """
     Given a module name and a function, returns the corresponding function.
     Since we're in the query module, it is assumed that this returns an
     iterable of objects of some kind, which we want to query over, though
     that isn't required
+
+    Results are cached, so repeated lookups of the same function are cheap
     """
     try:
         mod = importlib.import_module(module_name)
-        for fname, f in inspect.getmembers(mod, inspect.isfunction):
-            if fname == function_name:
-                return f
-        # in case the function is defined dynamically,
+        # a plain getattr finds regular functions, as well as functions defined dynamically,
         # like with a globals().setdefault(...) or a module-level __getattr__ function
+        # (no need to scan the whole module with inspect.getmembers)
         func = getattr(mod, function_name, None)
         if func is not None and callable(func):
             return func
@@ -84,6 +93,24 @@ def locate_qualified_function(qualified_name: str) -> Callable[[], Iterable[ET]]
     return locate_function(qualified_name[:rdot_index], qualified_name[rdot_index + 1 :])
 
 
+# field names for dataclass/NamedTuple classes, computed once per class
+_FIELD_NAMES_CACHE: dict[type, tuple[str, ...]] = {}
+
+
+def _field_names(obj: Any) -> tuple[str, ...]:
+    cls = obj.__class__
+    names = _FIELD_NAMES_CACHE.get(cls)
+    if names is None:
+        if dataclasses.is_dataclass(cls):
+            # unlike __annotations__, this includes inherited fields, and skips ClassVar/InitVar annotations
+            names = tuple(f.name for f in dataclasses.fields(cls))
+        else:
+            assert hasattr(cls, '_fields'), "Could not find '_fields' on attribute which is assumed to be a NamedTuple"
+            names = tuple(cls._fields)
+        _FIELD_NAMES_CACHE[cls] = names
+    return names
+
+
 def attribute_func(obj: T, where: Where, default: U | None = None) -> OrderFunc | None:
     """
     Attempts to find an attribute which matches the 'where_function' on the object,
@@ -106,23 +133,35 @@ def attribute_func(obj: T, where: Where, default: U | None = None) -> OrderFunc
     orderfunc = attribute_func(val, where=lambda o: isinstance(o, datetime))
     orderfunc(val)
     > datetime.datetime(2021, 4, 5, 10, 52, 14, 395195)
+
     """
+    # if there's no default to fall back onto, use operator.itemgetter/attrgetter,
+    # which are much cheaper to call than a python lambda when sorting lots of items
     if isinstance(obj, dict):
         for k, v in obj.items():
             if where(v):
+                # dict subclasses (e.g. OrderedDict/defaultdict) aren't grouped by their keys
+                # in _determine_order_by_value_key, so the key might be missing on other items
+                if default is None and type(obj) is dict:
+                    return operator.itemgetter(k)  # type: ignore[return-value]
                 return lambda o: o.get(k, default)  # type: ignore[union-attr]
-    elif dataclasses.is_dataclass(obj):
-        for field_name in obj.__annotations__.keys():
-            if where(getattr(obj, field_name)):
-                return lambda o: getattr(o, field_name, default)
-    elif is_namedtuple(obj):
-        assert hasattr(obj, '_fields'), "Could not find '_fields' on attribute which is assumed to be a NamedTuple"
-        for field_name in getattr(obj, '_fields'):
+    elif dataclasses.is_dataclass(obj) or is_namedtuple(obj):
+        for field_name in _field_names(obj):
             if where(getattr(obj, field_name)):
+                if default is None:
+                    return operator.attrgetter(field_name)
                 return lambda o: getattr(o, field_name, default)
-    # try using inspect.getmembers (like 'dir()') even if the dataclass/NT checks failed,
+    # try using dir() even if the dataclass/NT checks failed,
     # since the attribute one is searching for might be a @property
-    for k, v in inspect.getmembers(obj):
+    # (not using inspect.getmembers, it's much slower, and we don't need dunder attributes anyway)
+    for k in dir(obj):
+        if k.startswith('__') and k.endswith('__'):
+            continue
+        try:
+            v = getattr(obj, k)
+        except Exception:
+            # e.g. property raising an error
+            continue
         if where(v):
             return lambda o: getattr(o, k, default)
     return None
@@ -183,6 +222,7 @@ pass 'drop_exceptions' to ignore exceptions""")
         # that you manually write an OrderFunc which
         # handles the edge cases, or provide a default
         # See tests for an example
+        # note: these are applied to items of any type, so they have to fall back onto the default
         if isinstance(obj, dict):
             if key in obj:  # acts as predicate instead of where_function
                 return lambda o: o.get(key, default)  # type: ignore[union-attr]
@@ -228,67 +268,89 @@ def _determine_order_by_value_key(obj_res: ET) -> Any:
     return key
 
 
-def _drop_unsorted(itr: Iterator[ET], orderfunc: OrderFunc) -> Iterator[ET]:
+# note: the _Unsortable default argument and the bound append methods are local variables
+# in the per-item loops, which are cheaper to look up than globals/attributes
+def _drop_unsorted(
+    itr: Iterator[ET],
+    orderfunc: OrderFunc,
+    _Unsortable: type[Unsortable] = Unsortable,
+) -> tuple[list[Any], list[ET]]:
+    keys: list[Any] = []
+    items: list[ET] = []
+    keys_append = keys.append
+    items_append = items.append
     for o in itr:
-        if isinstance(o, Unsortable):
+        if type(o) is _Unsortable:
             continue
         ordval = orderfunc(o)
         if ordval is None:
             continue
-        yield o
+        keys_append(ordval)
+        items_append(o)
+    return keys, items
 
 
 # try getting the first value from the iterator
 # similar to my.core.common.warn_if_empty? this doesn't go through the whole iterator though
+# note: not using more_itertools.peekable, since it adds a python level __next__ call for every item
 def _peek_iter(itr: Iterator[ET]) -> tuple[ET | None, Iterator[ET]]:
-    itr = more_itertools.peekable(itr)
-    try:
-        first_item = itr.peek()
-    except StopIteration:
+    first_item = next(itr, _SENTINEL)
+    if first_item is _SENTINEL:
         return None, itr
-    else:
-        return first_item, itr
+    return first_item, itertools.chain((first_item,), itr)
 
 
 # similar to 'my.core.error.sort_res_by'?
-def _wrap_unsorted(itr: Iterator[ET], orderfunc: OrderFunc) -> tuple[Iterator[Unsortable], Iterator[ET]]:
+def _wrap_unsorted(
+    itr: Iterator[ET],
+    orderfunc: OrderFunc,
+    _Unsortable: type[Unsortable] = Unsortable,
+) -> tuple[list[Unsortable], list[Any], list[ET]]:
     unsortable: list[Unsortable] = []
-    sortable: list[ET] = []
+    keys: list[Any] = []
+    items: list[ET] = []
+    unsortable_append = unsortable.append
+    keys_append = keys.append
+    items_append = items.append
     for o in itr:
         # if input to select was another select
-        if isinstance(o, Unsortable):
-            unsortable.append(o)
+        if type(o) is _Unsortable:
+            unsortable_append(o)
             continue
         ordval = orderfunc(o)
         if ordval is None:
-            unsortable.append(Unsortable(o))
+            unsortable_append(_Unsortable(o))
         else:
-            sortable.append(o)
-    return iter(unsortable), iter(sortable)
+            keys_append(ordval)
+            items_append(o)
+    return unsortable, keys, items
 
 
-# return two iterators, the first being the wrapped unsortable items,
-# the second being items for which orderfunc returned a non-none value
+# return three lists: the wrapped unsortable items, and the order keys along with the items to sort
+# the order key is computed once per item here and reused by the sort in select
+# note: keys and items are kept in separate lists rather than as (key, item) pairs,
+# since the cyclic gc would have to keep scanning all these tuples
 def _handle_unsorted(
     itr: Iterator[ET],
     *,
     orderfunc: OrderFunc,
     drop_unsorted: bool,
     wrap_unsorted: bool
-) -> tuple[Iterator[Unsortable], Iterator[ET]]:
+) -> tuple[list[Unsortable], list[Any], list[ET]]:
     # prefer drop_unsorted to wrap_unsorted, if both were present
     if drop_unsorted:
-        return iter([]), _drop_unsorted(itr, orderfunc)
+        return [], *_drop_unsorted(itr, orderfunc)
     elif wrap_unsorted:
         return _wrap_unsorted(itr, orderfunc)
     else:
         # neither flag was present
-        return iter([]), itr
+        items = list(itr)
+        return [], list(map(orderfunc, items)), items
 
 
 # handles creating an order_value function, using a lookup for
 # different types. ***This consumes the iterator***, so
-# you should definitely itertoolts.tee it beforehand
+# pass an iterator over a materialized list,
 # as to not exhaust the values
 def _generate_order_value_func(itr: Iterator[ET], order_value: Where, default: U | None = None) -> OrderFunc:
     # TODO: add a kwarg to force lookup for every item? would sort of be like core.common.guess_datetime then
@@ -308,11 +370,57 @@ def _generate_order_value_func(itr: Iterator[ET], order_value: Where, default: U
             assert keyfunc is not None
             order_by_lookup[key] = keyfunc
 
-    # todo: cache results from above _determine_order_by_value_key call and use here somehow?
-    # would require additional state
-    # order_by_lookup[_determine_order_by_value_key(o)] returns a function which
-    # accepts o, and returns the value which sorted can use to order this by
-    return lambda o: order_by_lookup[_determine_order_by_value_key(o)](o)
+    # the common case: all items are of the same type (or plain dicts with the same keys)
+    # then every item uses the same function, so no need to dispatch at all
+    # (items of a dict subclass all share one key regardless of their keys, but attribute_func
+    # returns a getter with a default for those, so it's safe to call on all of them)
+    if len(order_by_lookup) == 1:
+        [keyfunc] = order_by_lookup.values()
+        return keyfunc
+
+    # split the lookup, so non-dict items (the common case) only need a single
+    # dict.get on their class, instead of a _determine_order_by_value_key call
+    by_type: dict[type, OrderFunc] = {}
+    by_dict_keys: dict[tuple, OrderFunc] = {}
+    for key, keyfunc in order_by_lookup.items():
+        if isinstance(key, tuple):
+            by_dict_keys[key] = keyfunc
+        else:
+            by_type[key] = keyfunc
+
+    # returns the value which sorted can use to order o by
+    # lookups are bound as default arguments, so they are fast local variable accesses
+    def order_by(o: ET, _by_type_get=by_type.get, _by_dict_keys=by_dict_keys) -> Any:
+        keyfunc = _by_type_get(o.__class__)
+        if keyfunc is None:
+            keyfunc = _by_dict_keys[tuple(o.keys())]  # type: ignore[union-attr]
+        return keyfunc(o)
+
+    return order_by
+
+
+# like _generate_order_value_func, but generates the function for each type
+# on first sight while sorting, instead of going through all items beforehand
+# only used when a default is given: then every type resolves to some function anyway,
+# so there's no need to hold on to all items for a pre-scan
+def _generate_order_value_func_lazy(order_value: Where, default: U | None = None) -> OrderFunc:
+    order_by_lookup: dict[Any, OrderFunc] = {}
+
+    def order_by(o: ET, _lookup_get=order_by_lookup.get) -> Any:
+        key = _determine_order_by_value_key(o)
+        keyfunc = _lookup_get(key)
+        if keyfunc is None:
+            keyfunc = _generate_order_by_func(
+                o,
+                where_function=order_value,
+                default=default,
+                force_unsortable=True)
+            # should never be none, as we have force_unsortable=True
+            assert keyfunc is not None
+            order_by_lookup[key] = keyfunc
+        return keyfunc(o)
+
+    return order_by
 
 
 # handles the arguments from the user, creating a order_value function
@@ -343,9 +451,14 @@ def _handle_generate_order_by(
             raise QueryException(f"Error while ordering: could not find {order_key} on {first_item}")
         return order_by_chosen, itr
     if order_value is not None:
-        itr, itr2 = itertools.tee(itr, 2)
-        order_by_chosen = _generate_order_value_func(itr2, order_value, default)
-        return order_by_chosen, itr
+        if default is not None:
+            return _generate_order_value_func_lazy(order_value, default), itr
+        # need to go through the items twice, once here and once when sorting
+        # the sort materializes everything anyway, so a plain list is cheaper than itertools.tee,
+        # which would buffer every item in its own linked deque
+        items = list(itr)
+        order_by_chosen = _generate_order_value_func(iter(items), order_value, default)
+        return order_by_chosen, iter(items)
     raise QueryException("Could not determine a way to order src iterable - at least one of the order args must be set")
 
 
@@ -403,8 +516,7 @@ def select(
     but it can always be improved by providing a more complete guess function
 
     Note that 'order_value' is also the most computationally expensive, as it has
-    to copy the iterator in memory (using itertools.tee) to determine how to order it
-    in memory
+    to materialize the iterator in memory (as a list) to determine how to order it
 
     The 'drop_exceptions', 'raise_exceptions', 'warn_exceptions' let you ignore or raise
     when the src contains exceptions. The 'warn_func' lets you provide a custom function
@@ -466,15 +578,15 @@ Will attempt to call iter() on the value""")
     except TypeError as t:
         raise QueryException("Could not convert input src to an Iterator: " + str(t))  # noqa: B904
 
-    # if both drop_exceptions and drop_exceptions are provided for some reason,
+    # if both raise_exceptions and drop_exceptions are provided for some reason,
     # should raise exceptions before dropping them
+    # each of these removes all exceptions from the iterator, so only the first one that applies
+    # needs wrapping the iterator (the others would just add another generator to go through per item)
     if raise_exceptions:
         itr = err.raise_exceptions(itr)
-
-    if drop_exceptions:
+    elif drop_exceptions:
         itr = err.drop_exceptions(itr)
-
-    if warn_exceptions:
+    elif warn_exceptions:
         itr = err.warn_exceptions(itr, warn_func=warn_func)
 
     if where is not None:
@@ -501,21 +613,34 @@ Will attempt to call iter() on the value""")
         # note: can't just attach sort unsortable values in the same iterable as the
         # other items because they don't have any lookups for order_key or functions
         # to handle items in the order_by_lookup dictionary
-        unsortable, itr = _handle_unsorted(
+        unsortable, keys, items = _handle_unsorted(
             itr,
             orderfunc=order_by_chosen,
             drop_unsorted=drop_unsorted,
             wrap_unsorted=wrap_unsorted,
         )
 
-        # run the sort, with the computed order by function
-        itr = iter(sorted(itr, key=order_by_chosen, reverse=reverse))  # type: ignore[arg-type]
+        # run the sort, on the keys already computed by the order by function
+        # (decorate-sort-undecorate, the sort itself only compares the precomputed keys)
+        if limit is not None:
+            # only the first 'limit' items are needed, so a heap is cheaper than sorting everything
+            # unsortable items go to the front (or to the back if reversed), so they take up some of the limit
+            sorted_limit = limit if reverse else max(limit - len(unsortable), 0)
+            # these are equivalent to sorted(...)[:limit], including stability
+            top = heapq.nlargest if reverse else heapq.nsmallest
+            # pick the indices of the top items, so only 'limit' entries are kept around
+            itr = map(items.__getitem__, top(sorted_limit, range(len(keys)), key=keys.__getitem__))
+        else:
+            # list.sort computes the key of each item once, in order, before sorting
+            # so this hands it the precomputed keys, without building any (key, item) pairs
+            next_key = iter(keys).__next__
+            items.sort(key=lambda _o: next_key(), reverse=reverse)
+            itr = iter(items)
 
         # re-attach unsortable values to the front/back of the list
-        if reverse:
-            itr = itertools.chain(itr, unsortable)
-        else:
-            itr = itertools.chain(unsortable, itr)
+        # (typically there are none, then no need for the extra chain wrapper)
+        if unsortable:
+            itr = itertools.chain(itr, unsortable) if reverse else itertools.chain(unsortable, itr)
     else:
         # if not already done in the order_by block, reverse if specified
         if reverse:
@@ -572,6 +697,16 @@ def test_basic_orders() -> None:
     assert len(res) == 0
 
 
+def test_limit_same_as_full_sort() -> None:
+
+    # limit uses a heap instead of sorting everything, should give the same results
+    items = list(_mixed_iter_errors())
+    for reverse in (False, True):
+        full = list(select(items, order_key="z", reverse=reverse))
+        for limit in range(len(full) + 2):
+            assert list(select(items, order_key="z", reverse=reverse, limit=limit)) == full[:limit]
+
+
 def test_order_key_multi_type() -> None:
 
     def basic_iter() -> Iterator[_Int]:
@@ -600,6 +735,73 @@ def test_couldnt_determine_order() -> None:
     assert type(res[0].obj) is object
 
 
+def test_order_value_property() -> None:
+
+    class _Event:
+        def __init__(self, ts: int) -> None:
+            self._ts = ts
+
+        @property
+        def when(self) -> datetime:
+            return datetime.fromtimestamp(self._ts)
+
+        @property
+        def broken(self) -> datetime:
+            raise RuntimeError("shouldn't prevent finding other attributes")
+
+    events = [_Event(ts) for ts in (30, 10, 20)]
+    res = list(select(events, order_value=lambda o: isinstance(o, datetime)))
+    assert [e._ts for e in res] == [10, 20, 30]  # type: ignore[union-attr]
+
+
+@dataclasses.dataclass
+class _Base:
+    when: datetime
+
+
+@dataclasses.dataclass
+class _Derived(_Base):
+    # not a field, shouldn't be picked over the inherited one
+    created: ClassVar[datetime] = datetime(year=2000, month=1, day=1)
+    id: int
+
+
+def test_order_value_dataclass_fields() -> None:
+    items = [_Derived(when=datetime(year=2020, month=1, day=d), id=d) for d in (3, 1, 2)]
+    res = list(select(items, order_value=lambda o: isinstance(o, datetime)))
+    assert [d.id for d in res] == [1, 2, 3]  # type: ignore[union-attr]
+
+
+def test_attribute_func_default() -> None:
+    dt = datetime(year=2020, month=1, day=1)
+    is_dt = lambda o: isinstance(o, datetime)
+
+    dfunc = attribute_func({'a': dt}, where=is_dt, default=dt)
+    assert dfunc is not None
+    assert dfunc({'b': 1}) == dt
+
+    nfunc = attribute_func(_B(y=dt), where=is_dt, default=dt)
+    assert nfunc is not None
+    assert nfunc(_Int(x=1)) == dt
+
+
+def test_order_value_dict_subclass() -> None:
+    from collections import OrderedDict, defaultdict
+
+    dt = datetime(year=2020, month=1, day=1)
+    dt0 = datetime(year=2010, month=1, day=1)
+    items = [OrderedDict(a=dt), OrderedDict(b=1), OrderedDict(a=dt0)]
+    res = list(select(items, order_value=lambda o: isinstance(o, datetime), wrap_unsorted=True))
+    assert res == [Unsortable(obj=OrderedDict(b=1)), OrderedDict(a=dt0), OrderedDict(a=dt)]
+
+    d0: defaultdict[str, Any] = defaultdict(list, a=dt)
+    d1: defaultdict[str, Any] = defaultdict(list, b=1)
+    res = list(select([d0, d1], order_value=lambda o: isinstance(o, datetime), wrap_unsorted=True))
+    assert res == [Unsortable(obj=d1), d0]
+    # shouldn't insert the missing key into the user's data
+    assert 'a' not in d1
+
+
 # same value type, different keys, with clashing keys
 class _A(NamedTuple):
     x: datetime
@@ -0,0 +1,29 @@
+from datetime import datetime, timezone
+
+from ..compat import fromisoformat
+
+
+def test_fromisoformat() -> None:
+    # fmt: off
+    # feedbin has this format
+    assert fromisoformat('2020-05-01T10:32:02.925961Z') == datetime(
+        2020, 5, 1, 10, 32, 2, 925961, timezone.utc,
+    )
+
+    # polar has this format
+    assert fromisoformat('2018-11-28T22:04:01.304Z') == datetime(
+        2018, 11, 28, 22, 4, 1, 304000, timezone.utc,
+    )
+
+    # stackexchange, runnerup has this format
+    assert fromisoformat('2020-11-30T00:53:12Z') == datetime(
+        2020, 11, 30, 0, 53, 12, 0, timezone.utc,
+    )
+    # fmt: on
+
+    # arbtt has this format (sometimes less/more than 6 digits in milliseconds)
+    # TODO doesn't work atm, not sure if really should be supported...
+    # maybe should have flags for weird formats?
+    # assert isoparse('2017-07-18T18:59:38.21731Z') == datetime(
+    #     2017, 7, 18, 18, 59, 38, 217310, timezone.utc,
+    # )
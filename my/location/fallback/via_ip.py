@@ -24,11 +24,11 @@ class ip_config(location.via_ip):
 config = make_config(ip_config)
 
 
+from bisect import bisect_left
 from collections.abc import Iterator
 from functools import lru_cache
 
 from my.core import make_logger
-from my.core.compat import bisect_left
 from my.location.common import Location
 from my.location.fallback.common import DateExact, FallbackLocation, _datetime_timestamp
 